@@ -3,6 +3,8 @@
 
 import os
 
+from corpus import Corpus
+
 # Mapping of paper_id -> list of topic slugs
 PAPER_TOPICS = {
     # 2025
@@ -87,22 +89,19 @@ PAPER_TOPICS = {
 }
 
 def add_topics(pub_dir):
-    for fname in os.listdir(pub_dir):
-        if not fname.endswith('.txt'):
-            continue
-        paper_id = fname[:-4]
+    for paper_id, paper in Corpus(pub_dir):
         if paper_id not in PAPER_TOPICS:
             print(f"WARNING: No topics defined for {paper_id}")
             continue
 
-        fpath = os.path.join(pub_dir, fname)
-        with open(fpath, 'r') as f:
-            content = f.read()
-
         # Skip if topics already added
-        if 'topics::' in content:
+        if 'topics' in paper:
             continue
 
+        fpath = os.path.join(pub_dir, paper_id + '.txt')
+        with open(fpath, 'r') as f:
+            content = f.read()
+
         topics = ', '.join(PAPER_TOPICS[paper_id])
         # Add topics line before the end of the file
         content = content.rstrip() + '\n'
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Benchmark the site build on synthetic corpora.
+
+Usage: python build/bench.py [--sizes 100,1000,10000] [--people 400] [--jobs 4]
+
+For each corpus size this generates that many paper .txt/bibtex files and a
+people.json with the given number of members in a temporary directory, then
+runs a cold serial build and (if --jobs is above 1) a cold --jobs build
+against it. Every build runs in its own subprocess so peak RSS is measured
+in isolation. The report shows wall time, time per build stage and peak RSS
+(of the build process and of its largest worker).
+"""
+
+import os
+import sys
+import json
+import random
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+STAGES = ('corpus', 'bibtex', 'cards', 'render', 'write')
+VENUES = ('CVPR', 'ICCV', 'ECCV', 'NeurIPS', 'ICLR', 'CoRL', 'ICRA', '3DV')
+WORDS = ('neural', 'implicit', 'shape', 'scene', 'object', 'hand', 'pose', 'view',
+         'diffusion', 'dynamics', 'physical', 'sparse', 'reconstruction', 'robot')
+FIRST_NAMES = ('Alex', 'Jordan', 'Sam', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie')
+LAST_NAMES = ('Lee', 'Patel', 'Garcia', 'Kim', 'Nguyen', 'Smith', 'Chen', 'Cohen')
+
+
+def random_name(rng):
+    return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+
+def generate_corpus(root, n_papers, n_people, seed=0):
+    """Write a synthetic data/ tree under `root` and return its PUBLICATIONS list."""
+    import build
+
+    rng = random.Random(seed)
+    pub_dir = os.path.join(root, 'data', 'publications')
+    os.makedirs(os.path.join(pub_dir, 'bibs'), exist_ok=True)
+    topics = list(build.TOPIC_LABELS)
+
+    publications = []
+    per_year = max(1, n_papers // 20)
+    for i in range(n_papers):
+        year = 2026 - i // per_year
+        if i % per_year == 0:
+            publications.append(('year', str(year), False))
+        paper_id = f'synth{year}p{i}'
+        publications.append((paper_id, i < per_year, i % 7 == 0))
+
+        title = ' '.join(rng.choice(WORDS) for _ in range(6)).title()
+        authors = ', '.join([random_name(rng) for _ in range(rng.randint(2, 6))] + ['Shubham Tulsiani'])
+        venue = rng.choice(VENUES)
+        lines = [
+            f'title:: {title}',
+            f'img:: figures/{paper_id}.png',
+            f'author:: {authors}',
+            f'venue:: {venue}, {year}',
+            f'pdf:: https://arxiv.org/pdf/{year % 100:02d}{i:05d}.pdf',
+            f'project page:: https://example.org/{paper_id}/',
+            f'bibtex:: bibs/{paper_id}.txt',
+            f'code:: https://github.com/example/{paper_id}',
+            f'topics:: {", ".join(rng.sample(topics, rng.randint(1, 2)))}',
+        ]
+        if i % 5 == 0:
+            lines.insert(4, 'note:: Oral')
+        with open(os.path.join(pub_dir, paper_id + '.txt'), 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        with open(os.path.join(pub_dir, 'bibs', paper_id + '.txt'), 'w') as f:
+            f.write(f'@inproceedings{{{paper_id},\n'
+                    f'  title={{{title}}},\n'
+                    f'  author={{{authors.replace(", ", " and ")}}},\n'
+                    f'  booktitle={{{venue}}},\n'
+                    f'  year={{{year}}}\n}}\n')
+
+    def member(i, **extra):
+        person = {'name': random_name(rng), 'url': f'https://example.org/~m{i}/',
+                  'photo': f'assets/people/m{i}.jpg'}
+        person.update(extra)
+        return person
+
+    quarter = max(1, n_people // 4)
+    people = {
+        'pi': {'name': 'Shubham Tulsiani', 'photo': 'assets/people/shubham.jpg'},
+        'phd_students': [member(i) for i in range(quarter)],
+        'ms_students': [member(i, program='MSR') for i in range(quarter, 2 * quarter)],
+        'prospective_text': '<p>Synthetic prospective-student text.</p>',
+        'alumni': {
+            'phd': [{'name': random_name(rng), 'url': '#', 'thesis': 'A Thesis', 'year': 2020,
+                     'destination': 'Somewhere'} for _ in range(quarter // 2)],
+            'msr': [{'name': random_name(rng), 'url': '#', 'destination': 'Elsewhere'}
+                    for _ in range(quarter // 2)],
+            'mscv': [{'name': random_name(rng), 'url': '#'} for _ in range(quarter)],
+            'undergrad': [{'name': random_name(rng), 'url': '#'} for _ in range(quarter)],
+        },
+    }
+    with open(os.path.join(root, 'data', 'people.json'), 'w') as f:
+        json.dump(people, f)
+    with open(os.path.join(root, 'publications.json'), 'w') as f:
+        json.dump(publications, f)
+    return publications
+
+
+def run_one(root, jobs):
+    """Build the synthetic site under `root` in this process and print a JSON result line."""
+    import io
+    import time
+    import resource
+    import contextlib
+
+    import build
+    import instrument
+
+    with open(os.path.join(root, 'publications.json')) as f:
+        build.PUBLICATIONS = [tuple(entry) for entry in json.load(f)]
+    build.ROOT = root
+    build.DATA_DIR = os.path.join(root, 'data')
+    build.PUB_DIR = os.path.join(build.DATA_DIR, 'publications')
+    build.CACHE_DIR = os.path.join(root, '.cache')
+    build.MANIFEST_PATH = os.path.join(build.CACHE_DIR, 'manifest.json')
+    build.CORPUS_CACHE_PATH = os.path.join(build.CACHE_DIR, 'corpus.json')
+    shutil.rmtree(build.CACHE_DIR, ignore_errors=True)
+
+    instrument.reset()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        build.main(['--jobs', str(jobs)])
+    wall = time.perf_counter() - start
+
+    print(json.dumps({
+        'wall': wall,
+        'stages': instrument.snapshot(),
+        'rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'child_rss_kb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+        'page_bytes': os.path.getsize(os.path.join(root, 'publications.html')),
+    }))
+
+
+def measure(root, jobs):
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '--run-one', root, '--jobs', str(jobs)],
+                         check=True, capture_output=True, text=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def print_result(n_papers, jobs, result):
+    stages = ' '.join(f'{name}={result["stages"].get(name, 0.0):6.3f}s' for name in STAGES)
+    print(f'{n_papers:>6} papers  jobs={jobs:<2} wall={result["wall"]:7.3f}s  {stages}  '
+          f'rss={result["rss_kb"] / 1024:6.1f}MB  worker_rss={result["child_rss_kb"] / 1024:6.1f}MB  '
+          f'publications.html={result["page_bytes"] / 1024:8.1f}KB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the site build on synthetic corpora.')
+    parser.add_argument('--sizes', default='100,1000,10000',
+                        help='comma-separated corpus sizes (number of papers)')
+    parser.add_argument('--people', type=int, default=400, help='number of members in people.json')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 2,
+                        help='worker processes for the parallel build')
+    parser.add_argument('--keep', action='store_true', help='keep the generated corpora')
+    parser.add_argument('--run-one', metavar='ROOT', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        run_one(args.run_one, args.jobs)
+        return
+
+    job_counts = (1, args.jobs)
+    if args.jobs <= 1:
+        print('--jobs is 1 or less; running the serial build only')
+        job_counts = (1,)
+
+    base = tempfile.mkdtemp(prefix='ppl-bench-')
+    try:
+        for n_papers in (int(n) for n in args.sizes.split(',')):
+            root = os.path.join(base, str(n_papers))
+            generate_corpus(root, n_papers, args.people)
+            for jobs in job_counts:
+                print_result(n_papers, jobs, measure(root, jobs))
+    finally:
+        if args.keep:
+            print(f'Corpora kept in {base}')
+        else:
+            shutil.rmtree(base)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,17 +4,65 @@
 Reads publication .txt files + people.json + HTML templates and generates
 index.html, publications.html, and people.html.
 
-Usage: python build/build.py  (from the ppl/ directory)
+Usage: python build/build.py [--incremental] [--jobs N] [--media] [--lazy-details]
+                             [--stats] [--profile STAGE] [--check-budgets]
+       (from the ppl/ directory)
+
+With --incremental, pages (and individual publication cards) whose inputs
+are unchanged since the last build are reused instead of regenerated.
+With --jobs N, the pages are built concurrently and publication cards are
+rendered in chunks by a pool of N worker processes.
+With --media, resized WebP variants of assets/figures are (re)generated
+into assets/derived/ first; images with variants get srcset/sizes and
+intrinsic width/height attributes.
+With --lazy-details, bibtex entries and abstracts are written to per-paper
+files under assets/bib/ and assets/abs/ instead of being inlined into
+publications.html, and toggleblock() fetches them on first open. A build
+without it removes those directories again.
+With --stats, time and allocated memory per build stage are printed, then
+the size of each page, the largest cards and the weight of referenced media.
+--profile STAGE runs cProfile while STAGE is executing, and --check-budgets
+fails the build if a page, card or figure exceeds build/budgets.json.
 """
 
 import os
+import sys
 import json
+import math
+import shutil
+import pstats
+import argparse
+import multiprocessing
 import html as html_module
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import corpus
+import incremental
+import instrument
+import media
+import report
+import templating
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(ROOT, 'data')
 PUB_DIR = os.path.join(DATA_DIR, 'publications')
 TEMPLATE_DIR = os.path.join(ROOT, 'build', 'templates')
+CACHE_DIR = os.path.join(ROOT, 'build', '.cache')
+MANIFEST_PATH = os.path.join(CACHE_DIR, 'manifest.json')
+BUDGETS_PATH = os.path.join(ROOT, 'build', 'budgets.json')
+PAGES = ('index.html', 'publications.html', 'people.html')
+PROFILE_STAGES = ('corpus', 'bibtex', 'cards', 'render', 'write', 'media')
+FIGURES_DIR = os.path.join(ROOT, 'assets', 'figures')
+DERIVED_DIR = os.path.join(ROOT, 'assets', 'derived')
+MEDIA_INDEX_PATH = os.path.join(DERIVED_DIR, 'media.json')
+BIB_OUT_DIR = os.path.join(ROOT, 'assets', 'bib')
+ABS_OUT_DIR = os.path.join(ROOT, 'assets', 'abs')
+CORPUS_CACHE_PATH = os.path.join(CACHE_DIR, 'corpus.json')
+WRITE_BUFFER_SIZE = 64 * 1024
+# Card chunks submitted per worker process with --jobs, to balance uneven cards
+CHUNKS_PER_JOB = 4
+CODE_FILES = [os.path.abspath(__file__), corpus.__file__, incremental.__file__, media.__file__,
+              templating.__file__]
 
 TOPIC_LABELS = {
     '3d-reconstruction': '3D Reconstruction',
@@ -109,32 +157,19 @@ PUBLICATIONS = [
     ('uist13colors', False, False),
 ]
 
-# Keys that are not rendered as links
-SKIP_LINK_KEYS = {'title', 'author', 'venue', 'img', 'imgbase', 'abstract', 'note', 'topics'}
-
+# `sizes` attribute for each media class that gets responsive variants
+MEDIA_SIZES = {
+    'card--project__media': '(max-width: 768px) 100vw, (max-width: 1024px) 220px, 260px',
+}
 
-def read_file(fpath):
-    with open(fpath, 'r') as f:
-        return f.read()
+# Figure path -> responsive variants, loaded from MEDIA_INDEX_PATH in main()
+MEDIA_INDEX = {}
 
+# If True, cards reference per-paper bibtex/abstract files instead of inlining them
+LAZY_DETAILS = False
 
-def parse_paper(paper_id):
-    """Parse a publication .txt file and return a dict of fields."""
-    fpath = os.path.join(PUB_DIR, paper_id + '.txt')
-    elems = {}
-    ordered_keys = []
-    with open(fpath, 'r') as f:
-        for ln in f:
-            parts = ln.split('::', 1)
-            if len(parts) != 2:
-                continue
-            key = parts[0].strip()
-            val = parts[1].strip()
-            elems[key] = val
-            if key not in ('title', 'author', 'venue', 'img', 'imgbase'):
-                ordered_keys.append(key)
-    elems['_ordered_keys'] = ordered_keys
-    return elems
+# Keys that are not rendered as links
+SKIP_LINK_KEYS = {'title', 'author', 'venue', 'img', 'imgbase', 'abstract', 'note', 'topics'}
 
 
 def rewrite_img_path(img_path):
@@ -146,14 +181,42 @@ def rewrite_img_path(img_path):
     return img_path
 
 
+def set_media_index(index):
+    """Install the responsive variant index."""
+    global MEDIA_INDEX
+    MEDIA_INDEX = index
+
+
+def init_card_worker(media_index, lazy_details):
+    """Process pool initializer: copy the card rendering settings into the worker."""
+    global LAZY_DETAILS
+    set_media_index(media_index)
+    LAZY_DETAILS = lazy_details
+
+
+def detail_url(kind, paper_id):
+    """Site-relative URL of a paper's lazily loaded 'bib' or 'abs' file."""
+    return f'assets/{kind}/{paper_id}.txt'
+
+
 def make_media_tag(img_path, css_class, title=''):
     """Create an img or video tag based on file extension."""
     img_path = rewrite_img_path(img_path)
     alt = html_module.escape(title, quote=True)
     if img_path.endswith('.mp4') or img_path.endswith('.m4v'):
         return f'<video class="{css_class}" muted autoplay loop playsinline><source src="{img_path}" type="video/mp4"></video>'
-    else:
+    entry = MEDIA_INDEX.get(img_path)
+    if entry is None or css_class not in MEDIA_SIZES:
         return f'<img class="{css_class}" src="{img_path}" alt="{alt}" loading="lazy">'
+    if not entry['variants']:
+        # No variant came out smaller than the original; keep the intrinsic size
+        return (f'<img class="{css_class}" src="{img_path}" width="{entry["width"]}" '
+                f'height="{entry["height"]}" alt="{alt}" loading="lazy">')
+    # Variants are WebP only; browsers without WebP support fall back to the original
+    return (f'<picture><source type="image/webp" srcset="{media.srcset(entry)}" '
+            f'sizes="{MEDIA_SIZES[css_class]}">'
+            f'<img class="{css_class}" src="{img_path}" width="{entry["width"]}" '
+            f'height="{entry["height"]}" alt="{alt}" loading="lazy"></picture>')
 
 
 def bold_pi(author_str):
@@ -161,90 +224,195 @@ def bold_pi(author_str):
     return author_str.replace('Shubham Tulsiani', '<strong>Shubham Tulsiani</strong>')
 
 
+def card_topics(elems):
+    """Topic slugs listed in a paper's `topics::` field."""
+    return [t.strip() for t in elems.get('topics', '').split(',') if t.strip()]
+
+
 def build_project_card(paper_id, elems, is_new, current_year):
-    """Build HTML for a project card on the projects page."""
-    topics_str = elems.get('topics', '')
-    topics_list = [t.strip() for t in topics_str.split(',') if t.strip()]
+    """Yield the HTML fragments of a project card on the projects page."""
+    topics_list = card_topics(elems)
 
-    s = f'<div class="card--project" id="{paper_id}" data-year="{current_year}" data-topics="{",".join(topics_list)}">\n'
+    yield f'<div class="card--project" id="{paper_id}" data-year="{current_year}" data-topics="{",".join(topics_list)}">\n'
 
     # Media
     if 'img' in elems:
-        s += f'  <div class="card--project__media-wrap">\n'
-        s += f'    {make_media_tag(elems["img"], "card--project__media", elems.get("title", ""))}\n'
-        s += f'  </div>\n'
+        yield f'  <div class="card--project__media-wrap">\n'
+        yield f'    {make_media_tag(elems["img"], "card--project__media", elems.get("title", ""))}\n'
+        yield f'  </div>\n'
 
     # Body
-    s += f'  <div class="card--project__body">\n'
+    yield f'  <div class="card--project__body">\n'
 
     # Title
-    s += f'    <div class="card--project__title">{elems.get("title", "")}</div>\n'
+    yield f'    <div class="card--project__title">{elems.get("title", "")}</div>\n'
 
     # Authors
-    s += f'    <div class="card--project__authors">{bold_pi(elems.get("author", ""))}</div>\n'
+    yield f'    <div class="card--project__authors">{bold_pi(elems.get("author", ""))}</div>\n'
 
     # Venue + note
     venue = elems.get('venue', '')
     note = elems.get('note', '')
     if note:
-        s += f'    <div class="card--project__venue">{venue} <span class="card--project__note">({note})</span></div>\n'
+        yield f'    <div class="card--project__venue">{venue} <span class="card--project__note">({note})</span></div>\n'
     else:
-        s += f'    <div class="card--project__venue">{venue}</div>\n'
+        yield f'    <div class="card--project__venue">{venue}</div>\n'
 
     # Links
-    s += f'    <div class="card--project__links">\n'
+    yield f'    <div class="card--project__links">\n'
     for key in elems['_ordered_keys']:
-        if key in SKIP_LINK_KEYS:
-            continue
         link = elems[key]
         if key == 'bibtex':
             bib_id = paper_id + 'Bib'
-            s += f'      <a class="card--project__link" href="javascript:toggleblock(\'{bib_id}\')">{key}</a>\n'
+            yield f'      <a class="card--project__link" href="javascript:toggleblock(\'{bib_id}\')">{key}</a>\n'
+        elif key == 'abstract' and LAZY_DETAILS and elems['_abstract'] is not None:
+            abs_id = paper_id + 'Abs'
+            yield f'      <a class="card--project__link" href="javascript:toggleblock(\'{abs_id}\')">{key}</a>\n'
+        elif key in SKIP_LINK_KEYS:
+            continue
         else:
-            s += f'      <a class="card--project__link" href="{link}" target="_blank" rel="noopener">{key}</a>\n'
-    s += f'    </div>\n'
+            yield f'      <a class="card--project__link" href="{link}" target="_blank" rel="noopener">{key}</a>\n'
+    yield f'    </div>\n'
 
     # BibTeX content
     if 'bibtex' in elems:
         bib_id = paper_id + 'Bib'
-        bib_path = os.path.join(PUB_DIR, elems['bibtex'])
-        try:
-            bib_content = html_module.escape(read_file(bib_path).strip())
-        except FileNotFoundError:
-            bib_content = '(bibtex file not found)'
-        s += f'    <pre class="bibtex-content" id="{bib_id}">{bib_content}</pre>\n'
+        if elems['_bibtex'] is None:
+            yield f'    <pre class="bibtex-content" id="{bib_id}">(bibtex file not found)</pre>\n'
+        elif LAZY_DETAILS:
+            yield f'    <pre class="bibtex-content" id="{bib_id}" data-src="{detail_url("bib", paper_id)}"></pre>\n'
+        else:
+            bib_content = html_module.escape(elems['_bibtex'].strip())
+            yield f'    <pre class="bibtex-content" id="{bib_id}">{bib_content}</pre>\n'
+
+    # Abstract content (only with lazy details; abstracts are not inlined)
+    if LAZY_DETAILS and elems['_abstract'] is not None:
+        abs_id = paper_id + 'Abs'
+        yield f'    <div class="abstract-content" id="{abs_id}" data-src="{detail_url("abs", paper_id)}"></div>\n'
 
     # Topic tags
     if topics_list:
-        s += f'    <div class="card--project__topics">\n'
+        yield f'    <div class="card--project__topics">\n'
         for t in topics_list:
             label = TOPIC_LABELS.get(t, t)
-            s += f'      <span class="card--project__topic">{label}</span>\n'
-        s += f'    </div>\n'
+            yield f'      <span class="card--project__topic">{label}</span>\n'
+        yield f'    </div>\n'
+
+    yield f'  </div>\n'
+    yield f'</div>\n'
+
+
+def card_key(elems, is_new, current_year):
+    """Digest of everything a project card's HTML depends on."""
+    media_entry = media.markup_fields(MEDIA_INDEX.get(rewrite_img_path(elems.get('img', ''))))
+    return incremental.digest(json.dumps([elems['_digests'], is_new, current_year, media_entry,
+                                          LAZY_DETAILS], sort_keys=True))
 
-    s += f'  </div>\n'
-    s += f'</div>\n'
-    return s
 
+def render_cards(chunk):
+    """Render a chunk of (paper_id, elems, is_new, current_year) card jobs to HTML strings.
 
-def build_projects_html():
-    """Build the full projects list HTML with year dividers."""
-    html = ''
+    This is the unit of work sent to worker processes with --jobs.
+    """
+    return [''.join(build_project_card(*job)) for job in chunk]
+
+
+def render_cards_parallel(papers, manifest, pool, jobs):
+    """Render every card missing from the manifest's fragment cache in the process pool.
+
+    Returns {(paper_id, card key): html}.
+    """
+    pending = []
+    current_year = ''
+    for entry in PUBLICATIONS:
+        if entry[0] == 'year':
+            current_year = str(entry[1])
+            continue
+        paper_id, is_new, is_selected = entry
+        elems = papers.get(paper_id)
+        if not manifest.has_card(paper_id, card_key(elems, is_new, current_year)):
+            pending.append((paper_id, elems, is_new, current_year))
+    if not pending:
+        return {}
+
+    chunk_size = max(1, math.ceil(len(pending) / (jobs * CHUNKS_PER_JOB)))
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    rendered = {}
+    with instrument.stage('cards'):
+        for chunk, cards in zip(chunks, pool.map(render_cards, chunks)):
+            for (paper_id, elems, is_new, current_year), card in zip(chunk, cards):
+                rendered[paper_id, card_key(elems, is_new, current_year)] = card
+    return rendered
+
+
+def build_projects_html(papers, manifest, pool=None, jobs=1):
+    """Yield the projects list HTML with year dividers, one fragment at a time.
+
+    Cards whose inputs are unchanged are taken from the manifest's fragment
+    cache instead of being re-rendered. If a process pool is given, the
+    remaining cards are rendered there up front and reassembled in
+    PUBLICATIONS order, so the output does not depend on `jobs`.
+    """
+    rendered = {}
+    if pool is not None:
+        rendered = render_cards_parallel(papers, manifest, pool, jobs)
     current_year = ''
     for entry in PUBLICATIONS:
         if entry[0] == 'year':
             current_year = str(entry[1])
-            html += f'<div class="year-divider" data-year="{current_year}">\n'
-            html += f'  <span class="year-divider__label">{current_year}</span>\n'
-            html += f'</div>\n'
+            yield f'<div class="year-divider" data-year="{current_year}">\n'
+            yield f'  <span class="year-divider__label">{current_year}</span>\n'
+            yield f'</div>\n'
         else:
             paper_id, is_new, is_selected = entry
-            elems = parse_paper(paper_id)
-            html += build_project_card(paper_id, elems, is_new, current_year)
-    return html
-
-
-def build_featured_json():
+            elems = papers.get(paper_id)
+            key = card_key(elems, is_new, current_year)
+            card = manifest.get_card(paper_id, key)
+            if card is None:
+                card = rendered.pop((paper_id, key), None)
+                if card is None:
+                    with instrument.stage('cards'):
+                        card = ''.join(build_project_card(paper_id, elems, is_new, current_year))
+                manifest.put_card(paper_id, key, card)
+            yield card
+
+
+def build_filter_index(papers):
+    """Build the JSON index used by the topic filter on the projects page.
+
+    Cards and year dividers are referred to by their ordinal in page order:
+      years     label of each year divider
+      cardYear  divider ordinal of each card
+      topics    topic slug -> card ordinals
+      counts    topic slug (and 'all') -> number of cards under each divider
+    """
+    years = []
+    card_year = []
+    topics = {}
+    counts = {'all': []}
+    for entry in PUBLICATIONS:
+        if entry[0] == 'year':
+            years.append(str(entry[1]))
+            for per_year in counts.values():
+                per_year.append(0)
+            continue
+        if not years:
+            raise ValueError(f'{entry[0]} is listed before the first year divider')
+        ordinal = len(card_year)
+        year = len(years) - 1
+        card_year.append(year)
+        counts['all'][year] += 1
+        for topic in card_topics(papers.get(entry[0])):
+            topics.setdefault(topic, []).append(ordinal)
+            if topic not in counts:
+                counts[topic] = [0] * len(years)
+            counts[topic][year] += 1
+    index = {'years': years, 'cardYear': card_year, 'topics': topics, 'counts': counts}
+    # Keep '</script>' sequences out of the inline JSON
+    return json.dumps(index, separators=(',', ':')).replace('<', '\\u003c')
+
+
+def build_featured_json(papers):
     """Build JSON array of selected publications for the featured section."""
     selected = []
     for entry in PUBLICATIONS:
@@ -253,7 +421,7 @@ def build_featured_json():
         paper_id, is_new, is_selected = entry
         if not is_selected:
             continue
-        elems = parse_paper(paper_id)
+        elems = papers.get(paper_id)
         img = rewrite_img_path(elems.get('img', ''))
         selected.append({
             'id': paper_id,
@@ -267,186 +435,395 @@ def build_featured_json():
 
 
 def build_person_card(person):
-    """Build HTML for a person card."""
-    s = '<div class="card--person">\n'
+    """Yield the HTML fragments of a person card."""
+    yield '<div class="card--person">\n'
     photo = person.get('photo', 'assets/people/placeholder.jpg')
     url = person.get('url', '#')
     name = person.get('name', '')
-    s += f'  <a href="{url}" target="_blank" rel="noopener">'
-    s += f'<img class="card--person__photo" src="{photo}" alt="{html_module.escape(name, quote=True)}" loading="lazy"></a>\n'
-    s += f'  <div class="card--person__name"><a href="{url}" target="_blank" rel="noopener">{name}</a></div>\n'
+    yield f'  <a href="{url}" target="_blank" rel="noopener">'
+    yield f'<img class="card--person__photo" src="{photo}" alt="{html_module.escape(name, quote=True)}" loading="lazy"></a>\n'
+    yield f'  <div class="card--person__name"><a href="{url}" target="_blank" rel="noopener">{name}</a></div>\n'
     meta_parts = []
     if 'program' in person:
         meta_parts.append(person['program'])
     if 'note' in person:
         meta_parts.append(person['note'])
     if meta_parts:
-        s += f'  <div class="card--person__meta">{" · ".join(meta_parts)}</div>\n'
-    s += '</div>\n'
-    return s
+        yield f'  <div class="card--person__meta">{" · ".join(meta_parts)}</div>\n'
+    yield '</div>\n'
 
 
 def build_pi_html(pi):
-    """Build the PI section HTML."""
-    s = '<div class="pi-section">\n'
-    s += f'  <img class="pi-section__photo" src="{pi["photo"]}" alt="{html_module.escape(pi["name"], quote=True)}">\n'
-    s += '  <div class="pi-section__info">\n'
-    s += f'    <h1 class="pi-section__name">{pi["name"]}</h1>\n'
-    s += f'    <p class="pi-section__bio">{pi["bio"]}</p>\n'
-    s += f'    <p class="pi-section__bio">{pi["bio_extra"]}</p>\n'
-    s += f'    <p class="pi-section__bio">Email: {pi["email"]} · Office: {pi["office"]}</p>\n'
-    s += '    <div class="pi-section__links">\n'
+    """Yield the PI section HTML fragments."""
+    yield '<div class="pi-section">\n'
+    yield f'  <img class="pi-section__photo" src="{pi["photo"]}" alt="{html_module.escape(pi["name"], quote=True)}">\n'
+    yield '  <div class="pi-section__info">\n'
+    yield f'    <h1 class="pi-section__name">{pi["name"]}</h1>\n'
+    yield f'    <p class="pi-section__bio">{pi["bio"]}</p>\n'
+    yield f'    <p class="pi-section__bio">{pi["bio_extra"]}</p>\n'
+    yield f'    <p class="pi-section__bio">Email: {pi["email"]} · Office: {pi["office"]}</p>\n'
+    yield '    <div class="pi-section__links">\n'
     for label, url in pi.get('links', {}).items():
-        s += f'      <a class="pi-section__link" href="{url}" target="_blank" rel="noopener">{label}</a>\n'
-    s += '    </div>\n'
-    s += '  </div>\n'
-    s += '</div>\n'
-    return s
+        yield f'      <a class="pi-section__link" href="{url}" target="_blank" rel="noopener">{label}</a>\n'
+    yield '    </div>\n'
+    yield '  </div>\n'
+    yield '</div>\n'
 
 
 def build_alumni_html(alumni):
-    """Build alumni sections."""
-    s = ''
-
+    """Yield the HTML fragments of the alumni sections."""
     # PhD alumni
     if alumni.get('phd'):
-        s += '<div class="alumni-section">\n'
-        s += '  <h3 class="alumni-section__title">PhD Alumni</h3>\n'
-        s += '  <ul class="alumni-list">\n'
+        yield '<div class="alumni-section">\n'
+        yield '  <h3 class="alumni-section__title">PhD Alumni</h3>\n'
+        yield '  <ul class="alumni-list">\n'
         for a in alumni['phd']:
             note = f' ({a["note"]})' if a.get('note') else ''
-            s += f'    <li class="alumni-list__item">'
-            s += f'<a href="{a["url"]}" target="_blank" rel="noopener">{a["name"]}</a>{note}, '
-            s += f'<span class="alumni-list__thesis">{a.get("thesis", "")}</span>, '
-            s += f'{a.get("year", "")}. {a.get("destination", "")}'
-            s += '</li>\n'
-        s += '  </ul>\n'
-        s += '</div>\n'
+            yield f'    <li class="alumni-list__item">'
+            yield f'<a href="{a["url"]}" target="_blank" rel="noopener">{a["name"]}</a>{note}, '
+            yield f'<span class="alumni-list__thesis">{a.get("thesis", "")}</span>, '
+            yield f'{a.get("year", "")}. {a.get("destination", "")}'
+            yield '</li>\n'
+        yield '  </ul>\n'
+        yield '</div>\n'
 
     # MSR alumni
     if alumni.get('msr'):
-        s += '<div class="alumni-section">\n'
-        s += '  <h3 class="alumni-section__title">MSR Alumni</h3>\n'
-        s += '  <ul class="alumni-list">\n'
+        yield '<div class="alumni-section">\n'
+        yield '  <h3 class="alumni-section__title">MSR Alumni</h3>\n'
+        yield '  <ul class="alumni-list">\n'
         for a in alumni['msr']:
             dest = f'. {a["destination"]}' if a.get('destination') else ''
-            s += f'    <li class="alumni-list__item">'
-            s += f'<a href="{a["url"]}" target="_blank" rel="noopener">{a["name"]}</a>{dest}'
-            s += '</li>\n'
-        s += '  </ul>\n'
-        s += '</div>\n'
+            yield f'    <li class="alumni-list__item">'
+            yield f'<a href="{a["url"]}" target="_blank" rel="noopener">{a["name"]}</a>{dest}'
+            yield '</li>\n'
+        yield '  </ul>\n'
+        yield '</div>\n'
 
     # MSCV alumni
     if alumni.get('mscv'):
-        s += '<div class="alumni-section">\n'
-        s += '  <h3 class="alumni-section__title">MSCV Alumni</h3>\n'
-        s += '  <ul class="alumni-list alumni-list--compact">\n'
+        yield '<div class="alumni-section">\n'
+        yield '  <h3 class="alumni-section__title">MSCV Alumni</h3>\n'
+        yield '  <ul class="alumni-list alumni-list--compact">\n'
         for a in alumni['mscv']:
-            s += f'    <li class="alumni-list__item">'
-            s += f'<a href="{a["url"]}" target="_blank" rel="noopener">{a["name"]}</a>'
-            s += '</li>\n'
-        s += '  </ul>\n'
-        s += '</div>\n'
+            yield f'    <li class="alumni-list__item">'
+            yield f'<a href="{a["url"]}" target="_blank" rel="noopener">{a["name"]}</a>'
+            yield '</li>\n'
+        yield '  </ul>\n'
+        yield '</div>\n'
 
     # Undergrad alumni
     if alumni.get('undergrad'):
-        s += '<div class="alumni-section">\n'
-        s += '  <h3 class="alumni-section__title">Undergraduate Alumni</h3>\n'
-        s += '  <ul class="alumni-list alumni-list--compact">\n'
+        yield '<div class="alumni-section">\n'
+        yield '  <h3 class="alumni-section__title">Undergraduate Alumni</h3>\n'
+        yield '  <ul class="alumni-list alumni-list--compact">\n'
         for a in alumni['undergrad']:
-            s += f'    <li class="alumni-list__item">'
-            s += f'<a href="{a["url"]}" target="_blank" rel="noopener">{a["name"]}</a>'
-            s += '</li>\n'
-        s += '  </ul>\n'
-        s += '</div>\n'
+            yield f'    <li class="alumni-list__item">'
+            yield f'<a href="{a["url"]}" target="_blank" rel="noopener">{a["name"]}</a>'
+            yield '</li>\n'
+        yield '  </ul>\n'
+        yield '</div>\n'
+
 
-    return s
+def get_template(name):
+    """Return the compiled template `name` from the templates directory."""
+    return templating.load_template(os.path.join(TEMPLATE_DIR, name))
 
 
 def render_page(page_title, content, nav_active, extra_scripts=''):
-    """Render a page by filling in the base template."""
-    base = read_file(os.path.join(TEMPLATE_DIR, 'base.html'))
+    """Yield the fragments of a page by filling in the base template."""
+    base = get_template('base.html')
     nav_map = {
         'overview': ('nav__link--active', '', ''),
         'projects': ('', 'nav__link--active', ''),
         'people': ('', '', 'nav__link--active'),
     }
     active = nav_map.get(nav_active, ('', '', ''))
-    result = base.replace('{{PAGE_TITLE}}', page_title)
-    result = result.replace('{{NAV_OVERVIEW_ACTIVE}}', active[0])
-    result = result.replace('{{NAV_PROJECTS_ACTIVE}}', active[1])
-    result = result.replace('{{NAV_PEOPLE_ACTIVE}}', active[2])
-    result = result.replace('{{CONTENT}}', content)
-    result = result.replace('{{EXTRA_SCRIPTS}}', extra_scripts)
-    return result
+    return base.render({
+        'PAGE_TITLE': page_title,
+        'NAV_OVERVIEW_ACTIVE': active[0],
+        'NAV_PROJECTS_ACTIVE': active[1],
+        'NAV_PEOPLE_ACTIVE': active[2],
+        'CONTENT': content,
+        'EXTRA_SCRIPTS': extra_scripts,
+    })
+
+
+def write_if_changed(out_path, text):
+    """Write `text` to out_path unless it already has exactly that content."""
+    try:
+        with open(out_path, 'r') as f:
+            if f.read() == text:
+                return
+    except FileNotFoundError:
+        pass
+    with open(out_path, 'w') as f:
+        f.write(text)
+
+
+def write_details(papers):
+    """Write the per-paper bibtex/abstract files used with --lazy-details.
+
+    Files for papers that are no longer listed (or no longer have an entry)
+    are removed, so the directories mirror PUBLICATIONS exactly. Without
+    --lazy-details no page references them, so both directories are removed.
+    """
+    wanted = {BIB_OUT_DIR: {}, ABS_OUT_DIR: {}}
+    if not LAZY_DETAILS:
+        for out_dir in wanted:
+            shutil.rmtree(out_dir, ignore_errors=True)
+        return
+    for entry in PUBLICATIONS:
+        if entry[0] == 'year':
+            continue
+        elems = papers.get(entry[0])
+        if 'bibtex' in elems and elems['_bibtex'] is not None:
+            wanted[BIB_OUT_DIR][entry[0] + '.txt'] = elems['_bibtex'].strip() + '\n'
+        if elems['_abstract'] is not None:
+            wanted[ABS_OUT_DIR][entry[0] + '.txt'] = elems['_abstract'].strip() + '\n'
+
+    for out_dir, files in wanted.items():
+        os.makedirs(out_dir, exist_ok=True)
+        for fname in os.listdir(out_dir):
+            if fname not in files:
+                os.remove(os.path.join(out_dir, fname))
+        for fname, text in files.items():
+            write_if_changed(os.path.join(out_dir, fname), text)
+
+
+def write_page(out_path, fragments):
+    """Stream page fragments to out_path, replacing it atomically once complete."""
+    tmp_path = out_path + '.tmp'
+    try:
+        with instrument.stage('write'):
+            with open(tmp_path, 'w', buffering=WRITE_BUFFER_SIZE) as f:
+                for fragment in instrument.timed_iter('render', fragments):
+                    f.write(fragment)
+            os.replace(tmp_path, out_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    print(f'  Generated {out_path}')
 
 
-def build_index():
+def template_inputs(*names):
+    return {f'template:{name}': incremental.file_digest(os.path.join(TEMPLATE_DIR, name))
+            for name in ('base.html',) + names}
+
+
+def build_index(papers, manifest):
     """Build the index.html page."""
-    template = read_file(os.path.join(TEMPLATE_DIR, 'index_template.html'))
-    featured_json = build_featured_json()
-    content = template.replace('{{FEATURED_JSON}}', featured_json)
+    out_path = os.path.join(ROOT, 'index.html')
+    selected = [entry[0] for entry in PUBLICATIONS if entry[0] != 'year' and entry[2]]
+    inputs = template_inputs('index_template.html')
+    inputs['ordering'] = incremental.digest(json.dumps(selected))
+    with instrument.stage('corpus'):
+        for paper_id in selected:
+            inputs[f'paper:{paper_id}'] = papers.get(paper_id)['_digests'][0]
+    if manifest.page_is_current('index.html', inputs, out_path):
+        return
+
+    content = get_template('index_template.html').render({'FEATURED_JSON': build_featured_json(papers)})
     scripts = '<script src="js/featured.js"></script>'
     page = render_page('Overview', content, 'overview', scripts)
-    out_path = os.path.join(ROOT, 'index.html')
-    with open(out_path, 'w') as f:
-        f.write(page)
-    print(f'  Generated {out_path}')
+    write_page(out_path, page)
+    manifest.record_page('index.html', inputs, out_path)
 
 
-def build_projects():
+def build_projects(papers, manifest, pool=None, jobs=1):
     """Build the publications.html page."""
-    template = read_file(os.path.join(TEMPLATE_DIR, 'projects_template.html'))
-    projects_html = build_projects_html()
-    content = template.replace('{{PROJECTS_HTML}}', projects_html)
+    out_path = os.path.join(ROOT, 'publications.html')
+    inputs = template_inputs('projects_template.html')
+    inputs['ordering'] = incremental.digest(json.dumps(PUBLICATIONS))
+    media_fields = {path: media.markup_fields(entry) for path, entry in MEDIA_INDEX.items()}
+    inputs['media'] = incremental.digest(json.dumps(media_fields, sort_keys=True))
+    inputs['lazy_details'] = LAZY_DETAILS
+    with instrument.stage('corpus'):
+        for entry in PUBLICATIONS:
+            if entry[0] != 'year':
+                paper_digests = papers.get(entry[0])['_digests']
+                inputs[f'paper:{entry[0]}'] = incremental.digest(json.dumps(paper_digests))
+    with instrument.stage('write'):
+        write_details(papers)
+    if manifest.page_is_current('publications.html', inputs, out_path):
+        return
+
+    manifest.begin_cards()
+    with instrument.stage('corpus'):
+        filter_index = build_filter_index(papers)
+    content = get_template('projects_template.html').render({
+        'PROJECTS_HTML': build_projects_html(papers, manifest, pool, jobs),
+        'FILTER_INDEX_JSON': filter_index,
+    })
     scripts = '<script src="js/projects.js"></script>'
     page = render_page('Publications', content, 'projects', scripts)
-    out_path = os.path.join(ROOT, 'publications.html')
-    with open(out_path, 'w') as f:
-        f.write(page)
-    print(f'  Generated {out_path}')
+    write_page(out_path, page)
+    manifest.record_page('publications.html', inputs, out_path)
 
 
-def build_people():
+def build_people(manifest):
     """Build the people.html page."""
+    out_path = os.path.join(ROOT, 'people.html')
     people_path = os.path.join(DATA_DIR, 'people.json')
+    inputs = template_inputs('people_template.html')
+    inputs['people.json'] = incremental.file_digest(people_path)
+    if manifest.page_is_current('people.html', inputs, out_path):
+        return
+
     with open(people_path, 'r') as f:
         people = json.load(f)
 
-    template = read_file(os.path.join(TEMPLATE_DIR, 'people_template.html'))
-
     faculty_card = build_person_card({
         'name': people['pi']['name'],
         'url': 'https://shubhtuls.github.io',
         'photo': people['pi']['photo'],
     })
-    phd_html = ''.join(build_person_card(p) for p in people['phd_students'])
-    ms_html = ''.join(build_person_card(p) for p in people['ms_students'])
+    phd_html = (frag for p in people['phd_students'] for frag in build_person_card(p))
+    ms_html = (frag for p in people['ms_students'] for frag in build_person_card(p))
     prospective_html = people.get('prospective_text', '')
     alumni_html = build_alumni_html(people.get('alumni', {}))
 
-    content = template
-    content = content.replace('{{FACULTY_HTML}}', faculty_card)
-    content = content.replace('{{PHD_STUDENTS_HTML}}', phd_html)
-    content = content.replace('{{MS_STUDENTS_HTML}}', ms_html)
-    content = content.replace('{{PROSPECTIVE_HTML}}', prospective_html)
-    content = content.replace('{{ALUMNI_HTML}}', alumni_html)
+    content = get_template('people_template.html').render({
+        'FACULTY_HTML': faculty_card,
+        'PHD_STUDENTS_HTML': phd_html,
+        'MS_STUDENTS_HTML': ms_html,
+        'PROSPECTIVE_HTML': prospective_html,
+        'ALUMNI_HTML': alumni_html,
+    })
 
     scripts = '<script src="js/projects.js"></script>'
     page = render_page('Members', content, 'people', scripts)
-    out_path = os.path.join(ROOT, 'people.html')
-    with open(out_path, 'w') as f:
-        f.write(page)
-    print(f'  Generated {out_path}')
-
-
-def main():
+    write_page(out_path, page)
+    manifest.record_page('people.html', inputs, out_path)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Build the Physical Perception Lab website.')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only rebuild pages and cards whose inputs changed since the last build')
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help='build pages concurrently and render cards in N worker processes')
+    parser.add_argument('--media', action='store_true',
+                        help='generate responsive WebP variants of assets/figures (requires Pillow)')
+    parser.add_argument('--lazy-details', action='store_true',
+                        help='load bibtex and abstracts on demand instead of inlining them')
+    parser.add_argument('--stats', action='store_true',
+                        help='print per-stage time/allocations and an output size report')
+    parser.add_argument('--profile', choices=PROFILE_STAGES, metavar='STAGE',
+                        help=f'run cProfile during one stage ({", ".join(PROFILE_STAGES)})')
+    parser.add_argument('--check-budgets', action='store_true',
+                        help='fail if a page, card or referenced figure exceeds its size budget')
+    parser.add_argument('--budgets', default=BUDGETS_PATH, metavar='PATH',
+                        help='budget file used by --check-budgets')
+    args = parser.parse_args(argv)
+    if args.profile and args.jobs > 1:
+        parser.error('--profile cannot be combined with --jobs')
+    if args.profile == 'media' and not args.media:
+        parser.error('--profile media needs --media (the media stage only runs with it)')
+    return args
+
+
+def referenced_media(papers):
+    """Site-relative paths of the media referenced by `img::` lines of listed papers."""
+    return [rewrite_img_path(papers.get(entry[0])['img']) for entry in PUBLICATIONS
+            if entry[0] != 'year' and 'img' in papers.get(entry[0])]
+
+
+def output_report(papers, manifest, args):
+    """Print the size report and/or check budgets. Returns the process exit status."""
+    pages = {name: os.path.getsize(os.path.join(ROOT, name)) for name in PAGES}
+    cards = manifest.card_sizes()
+    media_sizes, missing_media, remote_media = report.media_weights(ROOT, referenced_media(papers))
+    if args.stats:
+        report.print_report(pages, cards, media_sizes, missing_media, remote_media)
+    if not args.check_budgets:
+        return 0
+    violations = report.check_budgets(report.load_budgets(args.budgets), pages, cards, media_sizes,
+                                      missing_media)
+    if violations:
+        print(f'Size budgets exceeded ({len(violations)}):')
+        for violation in violations:
+            print(f'  {violation}')
+        return 1
+    print('  All size budgets met')
+    return 0
+
+
+def build_media(regenerate):
+    """Load the responsive variant index, regenerating the variants first if asked."""
+    if regenerate and not media.available():
+        print('  Skipping media variants: Pillow is not installed (pip install Pillow)')
+    elif regenerate:
+        with instrument.stage('media'):
+            _, processed, reused = media.process_figures(ROOT, FIGURES_DIR, DERIVED_DIR, MEDIA_INDEX_PATH)
+        print(f'  Media variants: {processed} figures processed, {reused} unchanged')
+    set_media_index(media.load_index(MEDIA_INDEX_PATH))
+
+
+def build_pages(papers, manifest, jobs=1):
+    """Build all pages, serially or (with jobs > 1) concurrently."""
+    if jobs <= 1:
+        build_index(papers, manifest)
+        build_projects(papers, manifest)
+        build_people(manifest)
+        return
+
+    # Worker processes are spawned rather than forked since the pool is
+    # driven from a page-builder thread.
+    mp_context = multiprocessing.get_context('spawn')
+    pool = ProcessPoolExecutor(jobs, mp_context=mp_context, initializer=init_card_worker,
+                               initargs=(MEDIA_INDEX, LAZY_DETAILS))
+    with pool, ThreadPoolExecutor(3) as threads:
+        futures = [
+            threads.submit(build_index, papers, manifest),
+            threads.submit(build_projects, papers, manifest, pool, jobs),
+            threads.submit(build_people, manifest),
+        ]
+        for future in futures:
+            future.result()
+
+
+def main(argv=None):
+    global LAZY_DETAILS
+    args = parse_args(argv)
+    LAZY_DETAILS = args.lazy_details
     print('Building Physical Perception Lab website...')
-    build_index()
-    build_projects()
-    build_people()
-    print('Done!')
+    if args.stats:
+        instrument.enable_tracemalloc()
+    if args.profile:
+        instrument.start_profile(args.profile)
+    manifest = incremental.Manifest(MANIFEST_PATH, incremental.code_digest(CODE_FILES),
+                                    incremental=args.incremental)
+    papers = corpus.Corpus(PUB_DIR, CORPUS_CACHE_PATH)
+    build_media(args.media)
+    build_pages(papers, manifest, args.jobs)
+    papers.save()
+    manifest.save()
+    manifest.report()
+    if args.incremental or args.stats:
+        papers.report()
+
+    if args.profile:
+        profile_path = os.path.join(CACHE_DIR, f'profile-{args.profile}.prof')
+        profiler = instrument.stop_profile()
+        if not profiler.getstats():
+            # e.g. 'bibtex' when every paper came from the corpus cache
+            print(f'Stage {args.profile!r} did not run; no profile recorded')
+        else:
+            profiler.dump_stats(profile_path)
+            print(f'Profile of stage {args.profile!r} (saved to {profile_path}):')
+            pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+    if args.stats:
+        print('Build stages:')
+        instrument.print_stats()
+        print('Output:')
+    status = 0
+    if args.stats or args.check_budgets:
+        status = output_report(papers, manifest, args)
+    print('Done!' if status == 0 else 'Failed!')
+    return status
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""Publication corpus loader shared by the build scripts.
+
+Each paper record is the dict of `key:: value` fields from its .txt file,
+plus a few derived entries:
+
+  _ordered_keys  keys in file order, excluding title/author/venue/img/imgbase
+  _bibtex        contents of the file named by `bibtex::`, or None if missing
+  _abstract      contents of the file named by `abstract::`, or None if missing
+  _digests       sha1 of the .txt, bibtex and abstract files (None if absent)
+
+Records are loaded at most once per Corpus. If a cache path is given, parsed
+records are persisted there and reused as long as the mtime and size of every
+file a record was built from are unchanged, so warm builds skip text parsing.
+"""
+
+import os
+import json
+import hashlib
+
+import instrument
+
+CACHE_VERSION = 1
+
+# Fields that are shown in the card header rather than as links
+HEADER_KEYS = ('title', 'author', 'venue', 'img', 'imgbase')
+
+
+def parse_paper_text(text):
+    """Parse the `key:: value` lines of a publication .txt file."""
+    elems = {}
+    ordered_keys = []
+    for ln in text.split('\n'):
+        parts = ln.split('::', 1)
+        if len(parts) != 2:
+            continue
+        key = parts[0].strip()
+        val = parts[1].strip()
+        elems[key] = val
+        if key not in HEADER_KEYS:
+            ordered_keys.append(key)
+    elems['_ordered_keys'] = ordered_keys
+    return elems
+
+
+def _stat_key(fpath):
+    try:
+        st = os.stat(fpath)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _read_optional(fpath):
+    try:
+        with open(fpath, 'r') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _digest(text):
+    if text is None:
+        return None
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+class Corpus:
+    """Lazily loaded, cached view of the papers in a publications directory."""
+
+    def __init__(self, pub_dir, cache_path=None):
+        self.pub_dir = pub_dir
+        self.cache_path = cache_path
+        self.parsed = 0
+        self.cached = 0
+        self._records = {}
+        self._cache = {}
+        self._dirty = False
+        if cache_path:
+            try:
+                with open(cache_path, 'r') as f:
+                    data = json.load(f)
+            except (FileNotFoundError, ValueError):
+                data = {}
+            if data.get('version') == CACHE_VERSION:
+                self._cache = data.get('papers', {})
+
+    def ids(self):
+        """Sorted ids of every paper .txt file in the publications directory."""
+        return sorted(fname[:-4] for fname in os.listdir(self.pub_dir)
+                      if fname.endswith('.txt'))
+
+    def __iter__(self):
+        for paper_id in self.ids():
+            yield paper_id, self.get(paper_id)
+
+    def path(self, paper_id):
+        return os.path.join(self.pub_dir, paper_id + '.txt')
+
+    def get(self, paper_id):
+        """Return the record for `paper_id`, loading it on first use."""
+        record = self._records.get(paper_id)
+        if record is None:
+            record = self._from_cache(paper_id)
+            if record is None:
+                record = self._load(paper_id)
+            else:
+                self.cached += 1
+            self._records[paper_id] = record
+        return record
+
+    def _sources(self, paper_id, record):
+        """Every file a record depends on, relative to the publications directory."""
+        sources = [paper_id + '.txt']
+        for key in ('bibtex', 'abstract'):
+            if key in record:
+                sources.append(record[key])
+        return sources
+
+    def _from_cache(self, paper_id):
+        entry = self._cache.get(paper_id)
+        if entry is None:
+            return None
+        for rel_path, stat_key in entry['stat'].items():
+            if _stat_key(os.path.join(self.pub_dir, rel_path)) != stat_key:
+                return None
+        return entry['record']
+
+    def _load(self, paper_id):
+        fpath = self.path(paper_id)
+        with open(fpath, 'r') as f:
+            text = f.read()
+        record = parse_paper_text(text)
+        self.parsed += 1
+        bibtex = None
+        abstract = None
+        with instrument.stage('bibtex'):
+            if 'bibtex' in record:
+                bibtex = _read_optional(os.path.join(self.pub_dir, record['bibtex']))
+            if 'abstract' in record:
+                abstract = _read_optional(os.path.join(self.pub_dir, record['abstract']))
+        record['_bibtex'] = bibtex
+        record['_abstract'] = abstract
+        record['_digests'] = [_digest(text), _digest(bibtex), _digest(abstract)]
+
+        if self.cache_path:
+            stat = {rel_path: _stat_key(os.path.join(self.pub_dir, rel_path))
+                    for rel_path in self._sources(paper_id, record)}
+            self._cache[paper_id] = {'stat': stat, 'record': record}
+            self._dirty = True
+        return record
+
+    def save(self):
+        """Persist newly parsed records to the cache file, if one is configured."""
+        if not self.cache_path or not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp_path = self.cache_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': CACHE_VERSION, 'papers': self._cache}, f)
+        os.replace(tmp_path, self.cache_path)
+        self._dirty = False
+
+    def report(self):
+        """Print how many records were parsed and how many came from the cache."""
+        print(f'  Corpus: {self.parsed} papers parsed, {self.cached} from cache')
@@ -0,0 +1,161 @@
+"""Content-hash dependency manifest for incremental builds.
+
+The manifest records, for every generated page, a digest of each input it
+was built from (paper .txt files, bibtex files, people.json, templates and
+the PUBLICATIONS ordering) plus a digest of the output that was written.
+It also records the size of every publication card and a digest of that
+card's inputs. Incremental builds store each card's HTML in its own file
+next to the manifest, so that an edit to one paper only re-renders one card
+without the whole set of cards being held in memory or in the manifest.
+
+A change to the build code itself invalidates the whole manifest.
+"""
+
+import os
+import json
+import hashlib
+
+MANIFEST_VERSION = 2
+
+
+def digest(data):
+    """Return a hex sha1 digest of a str or bytes value."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha1(data).hexdigest()
+
+
+def file_digest(fpath):
+    """Return a hex sha1 digest of a file's contents, or None if it is missing."""
+    try:
+        with open(fpath, 'rb') as f:
+            return digest(f.read())
+    except FileNotFoundError:
+        return None
+
+
+def code_digest(paths):
+    """Digest of the build code; any change forces a full rebuild."""
+    return digest(''.join(file_digest(p) or '-' for p in paths))
+
+
+class Manifest:
+    """Tracks page inputs and cached card fragments between builds.
+
+    When `incremental` is False nothing is considered up to date and card
+    HTML is not cached, but page inputs and card sizes are still recorded.
+    """
+
+    def __init__(self, path, code, incremental=False):
+        self.path = path
+        self.cards_dir = os.path.join(os.path.dirname(path), 'cards')
+        self.code = code
+        self.incremental = incremental
+        self.pages = {}
+        self.cards = {}
+        self.skipped_pages = []
+        self.cards_reused = 0
+        self.cards_built = 0
+        self._new_cards = None
+
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            data = {}
+        if data.get('version') == MANIFEST_VERSION and data.get('code') == code:
+            self.pages = data.get('pages', {})
+            self.cards = data.get('cards', {})
+
+    def page_is_current(self, name, inputs, out_path):
+        """True if `name` was last built from exactly `inputs` and is untouched on disk."""
+        if not self.incremental:
+            return False
+        entry = self.pages.get(name)
+        if entry is None or entry['inputs'] != inputs:
+            return False
+        if file_digest(out_path) != entry['output']:
+            return False
+        self.skipped_pages.append(name)
+        return True
+
+    def record_page(self, name, inputs, out_path):
+        self.pages[name] = {'inputs': inputs, 'output': file_digest(out_path)}
+
+    def _card_path(self, paper_id):
+        return os.path.join(self.cards_dir, paper_id + '.html')
+
+    def begin_cards(self):
+        """Start a fresh card table; cards not touched before save() are dropped."""
+        self._new_cards = {}
+
+    def has_card(self, paper_id, key):
+        """True if get_card() would return a cached fragment, without marking it used."""
+        entry = self.cards.get(paper_id)
+        return (self.incremental and entry is not None and entry['key'] == key
+                and os.path.exists(self._card_path(paper_id)))
+
+    def get_card(self, paper_id, key):
+        """Return the cached card HTML for `paper_id` if its inputs digest matches."""
+        entry = self.cards.get(paper_id)
+        if not self.incremental or entry is None or entry['key'] != key:
+            return None
+        try:
+            with open(self._card_path(paper_id), 'r') as f:
+                card_html = f.read()
+        except FileNotFoundError:
+            return None
+        self._new_cards[paper_id] = entry
+        self.cards_reused += 1
+        return card_html
+
+    def put_card(self, paper_id, key, card_html):
+        """Record a freshly rendered card; its HTML is only kept by incremental builds."""
+        if self.incremental:
+            os.makedirs(self.cards_dir, exist_ok=True)
+            with open(self._card_path(paper_id), 'w') as f:
+                f.write(card_html)
+        else:
+            key = None
+        self._new_cards[paper_id] = {'key': key, 'size': len(card_html.encode('utf-8'))}
+        self.cards_built += 1
+
+    def card_sizes(self):
+        """{paper_id: bytes of card HTML} for every card in the manifest."""
+        return {paper_id: entry['size'] for paper_id, entry in self.cards.items()}
+
+    def _prune_cards(self):
+        """Delete cached card files for cards that are no longer in the manifest."""
+        try:
+            fnames = os.listdir(self.cards_dir)
+        except FileNotFoundError:
+            return
+        for fname in fnames:
+            entry = self.cards.get(fname[:-len('.html')])
+            if entry is None or entry['key'] is None:
+                os.remove(os.path.join(self.cards_dir, fname))
+
+    def save(self):
+        if self._new_cards is not None:
+            self.cards = self._new_cards
+            self._prune_cards()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'code': self.code,
+                'pages': self.pages,
+                'cards': self.cards,
+            }, f)
+        os.replace(tmp_path, self.path)
+
+    def report(self):
+        """Print a summary of what was skipped or reused."""
+        if not self.incremental:
+            return
+        for name in self.skipped_pages:
+            print(f'  Skipped {name} (inputs unchanged)')
+        total = self.cards_reused + self.cards_built
+        if total:
+            print(f'  Cards: {self.cards_built} rendered, {self.cards_reused} reused of {total}')
@@ -0,0 +1,144 @@
+"""Per-stage timing, allocation accounting and profiling for the site build.
+
+Stages nest: time spent in an inner stage is charged to it and not to the
+enclosing one, so the totals add up to the instrumented wall time. Stacks
+are kept per thread, so pages built concurrently can be timed too (their
+totals are summed across threads).
+
+If enable_tracemalloc() was called, each stage also records how much memory
+it allocated. For every stretch of time a stage is the innermost one, the
+tracemalloc peak is reset at the start. The rise of the peak above the
+starting level is then charged to the stage. Memory freed and reallocated
+within one stretch is only counted once, so this is a lower bound on the
+bytes allocated. It is approximate when threads build pages concurrently,
+because they share one peak. A cProfile profiler can be attached to a
+single stage with start_profile(); it is only active while that stage is
+the innermost one.
+"""
+
+import time
+import cProfile
+import threading
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_local = threading.local()
+# stage -> [seconds, allocated bytes, calls]
+_totals = defaultdict(lambda: [0.0, 0, 0])
+_profile_stage = None
+_profiler = None
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _now():
+    """Return (time, traced bytes, traced peak) and start a new peak window."""
+    if not tracemalloc.is_tracing():
+        return time.perf_counter(), 0, 0
+    traced, peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    return time.perf_counter(), traced, peak
+
+
+def _charge(name, since, now, calls=0):
+    with _lock:
+        totals = _totals[name]
+        totals[0] += now[0] - since[0]
+        totals[1] += max(0, now[2] - since[1])
+        totals[2] += calls
+
+
+def _switch_profiler(stack):
+    if _profiler is None:
+        return
+    if stack and stack[-1][0] == _profile_stage:
+        _profiler.enable()
+    else:
+        _profiler.disable()
+
+
+@contextmanager
+def stage(name):
+    """Charge the time and allocations inside the block to stage `name`."""
+    stack = _stack()
+    now = _now()
+    if stack:
+        parent, since = stack[-1]
+        _charge(parent, since, now)
+    stack.append((name, now))
+    _switch_profiler(stack)
+    try:
+        yield
+    finally:
+        now = _now()
+        _charge(name, stack.pop()[1], now, calls=1)
+        if stack:
+            stack[-1] = (stack[-1][0], now)
+        _switch_profiler(stack)
+
+
+def timed_iter(name, iterable):
+    """Yield from `iterable`, charging the work of producing each item to stage `name`."""
+    it = iter(iterable)
+    while True:
+        with stage(name):
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+        yield item
+
+
+def enable_tracemalloc():
+    """Also record allocated bytes per stage (slows the build down noticeably)."""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def start_profile(stage_name):
+    """Profile everything that runs while `stage_name` is the innermost stage."""
+    global _profile_stage, _profiler
+    _profile_stage = stage_name
+    _profiler = cProfile.Profile()
+    return _profiler
+
+
+def stop_profile():
+    """Detach and return the profiler started by start_profile()."""
+    global _profile_stage, _profiler
+    profiler = _profiler
+    if profiler is not None:
+        profiler.disable()
+    _profile_stage = _profiler = None
+    return profiler
+
+
+def reset():
+    with _lock:
+        _totals.clear()
+
+
+def snapshot():
+    """Return {stage: seconds} for every stage entered since the last reset()."""
+    with _lock:
+        return {name: totals[0] for name, totals in _totals.items()}
+
+
+def print_stats():
+    """Print time, calls and (with tracemalloc) allocated KB per stage."""
+    with _lock:
+        rows = sorted(_totals.items(), key=lambda item: item[1][0], reverse=True)
+    tracing = tracemalloc.is_tracing()
+    print('  Stage          time (s)     calls' + ('  allocated KB' if tracing else ''))
+    for name, (seconds, allocated, calls) in rows:
+        line = f'  {name:<12} {seconds:10.4f} {calls:9d}'
+        if tracing:
+            line += f' {allocated / 1024:13.1f}'
+        print(line)
@@ -0,0 +1,168 @@
+"""Responsive image variants for assets/figures.
+
+process_figures() writes resized WebP variants (animated WebP for animated
+GIFs) of every figure into assets/derived/. It also records them in
+assets/derived/media.json, keyed by the figure's site-relative path:
+
+  {"assets/figures/x.gif": {"stat": [mtime_ns, size], "hash": sha1,
+                            "width": w, "height": h,
+                            "variants": [["assets/derived/x-<hash>-260.webp", 260], ...]}}
+
+Variant file names embed the source's content hash, so a figure is only
+reprocessed when its bytes change. Figures whose mtime and size are
+unchanged are not even re-hashed. Variants that come out no smaller than
+the source are dropped, so "variants" can be empty. Generating variants
+needs Pillow (pip install Pillow); reading the index does not, so pages can
+be built from committed variants without it.
+"""
+
+import os
+import json
+import hashlib
+
+try:
+    from PIL import Image, ImageSequence
+except ImportError:
+    Image = None
+
+INDEX_VERSION = 2
+# Card media is 260px wide on desktop (220px on tablets, full width on phones);
+# 2x and 3x cover high-density and phone screens.
+VARIANT_WIDTHS = (260, 520, 780)
+SOURCE_EXTS = ('.png', '.jpg', '.jpeg', '.gif')
+WEBP_QUALITY = 80
+
+
+def available():
+    """True if Pillow is installed and variants can be generated."""
+    return Image is not None
+
+
+def load_index(index_path):
+    try:
+        with open(index_path, 'r') as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if data.get('version') != INDEX_VERSION:
+        return {}
+    return data.get('figures', {})
+
+
+def save_index(index_path, index):
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'version': INDEX_VERSION, 'figures': index}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, index_path)
+
+
+def _file_hash(fpath):
+    sha = hashlib.sha1()
+    with open(fpath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _resize(frame, width):
+    height = max(1, round(frame.height * width / frame.width))
+    return frame.resize((width, height), Image.LANCZOS)
+
+
+def _write_variant(im, out_path, width):
+    """Save a `width`-wide WebP of `im`, keeping every frame if it is animated."""
+    if getattr(im, 'n_frames', 1) > 1:
+        frames = []
+        durations = []
+        for frame in ImageSequence.Iterator(im):
+            durations.append(frame.info.get('duration', im.info.get('duration', 100)))
+            frames.append(_resize(frame.convert('RGBA'), width))
+        frames[0].save(out_path, 'WEBP', save_all=True, append_images=frames[1:],
+                       duration=durations, loop=im.info.get('loop', 0), quality=WEBP_QUALITY)
+    else:
+        mode = 'RGBA' if im.mode in ('RGBA', 'LA', 'P') else 'RGB'
+        _resize(im.convert(mode), width).save(out_path, 'WEBP', quality=WEBP_QUALITY)
+
+
+def _make_variants(src_path, site_dir, derived_dir, digest, widths):
+    """Write the variants of one figure and return its index entry.
+
+    Every width below the source's is tried, plus a re-encode at the source
+    width. A variant is only kept if it is smaller than the source file, so
+    `variants` may be empty; width and height are recorded either way.
+    """
+    stem = os.path.splitext(os.path.basename(src_path))[0]
+    src_size = os.path.getsize(src_path)
+    with Image.open(src_path) as im:
+        width, height = im.size
+        targets = sorted({w for w in widths if w < width} | {width})
+        variants = []
+        for w in targets:
+            out_path = os.path.join(derived_dir, f'{stem}-{digest[:12]}-{w}.webp')
+            if not os.path.exists(out_path):
+                _write_variant(im, out_path, w)
+            if os.path.getsize(out_path) >= src_size:
+                os.remove(out_path)
+                continue
+            variants.append([os.path.relpath(out_path, site_dir), w])
+    return {'hash': digest, 'width': width, 'height': height, 'variants': variants}
+
+
+def process_figures(site_dir, figures_dir, derived_dir, index_path, widths=VARIANT_WIDTHS):
+    """Bring the derived variants and index up to date with `figures_dir`.
+
+    Returns (index, number of figures processed, number reused). Derived
+    files that no longer belong to any figure are removed.
+    """
+    old_index = load_index(index_path)
+    index = {}
+    processed = reused = 0
+    os.makedirs(derived_dir, exist_ok=True)
+
+    for fname in sorted(os.listdir(figures_dir)):
+        if not fname.lower().endswith(SOURCE_EXTS):
+            continue
+        src_path = os.path.join(figures_dir, fname)
+        key = os.path.relpath(src_path, site_dir)
+        st = os.stat(src_path)
+        stat = [st.st_mtime_ns, st.st_size]
+        entry = old_index.get(key)
+        outputs_exist = entry is not None and all(
+            os.path.exists(os.path.join(site_dir, path)) for path, _ in entry['variants'])
+
+        if entry is not None and outputs_exist and entry['stat'] == stat:
+            index[key] = entry
+            reused += 1
+            continue
+        digest = _file_hash(src_path)
+        if entry is not None and outputs_exist and entry['hash'] == digest:
+            index[key] = dict(entry, stat=stat)
+            reused += 1
+            continue
+
+        entry = _make_variants(src_path, site_dir, derived_dir, digest, widths)
+        entry['stat'] = stat
+        index[key] = entry
+        processed += 1
+
+    keep = {os.path.basename(path) for entry in index.values() for path, _ in entry['variants']}
+    keep.add(os.path.basename(index_path))
+    for fname in os.listdir(derived_dir):
+        if fname not in keep:
+            os.remove(os.path.join(derived_dir, fname))
+
+    save_index(index_path, index)
+    return index, processed, reused
+
+
+def markup_fields(entry):
+    """The parts of an index entry that end up in page HTML (not its stat key)."""
+    if entry is None:
+        return None
+    return {key: entry[key] for key in ('hash', 'width', 'height', 'variants')}
+
+
+def srcset(entry):
+    """The srcset attribute value for a figure's index entry."""
+    return ', '.join(f'{path} {w}w' for path, w in entry['variants'])
@@ -0,0 +1,95 @@
+"""Output size report and size budgets for the site build.
+
+Budgets are read from a JSON file (build/budgets.json by default):
+
+  {
+    "page_bytes": {"default": 262144, "publications.html": 524288},
+    "card_bytes": 8192,
+    "media_bytes": 2097152
+  }
+
+page_bytes limits each generated page (per-page entries override
+"default"), card_bytes limits the HTML of each publication card, and
+media_bytes limits every local figure referenced by an `img::` line.
+Remote media cannot be measured and is listed as such. Any key can be
+left out to skip that check. A local figure that is referenced but missing
+is always a violation.
+"""
+
+import os
+import json
+
+
+def _kb(n):
+    return f'{n / 1024:.1f} KB'
+
+
+def media_weights(site_dir, media_paths):
+    """Return ({site-relative path: bytes} of local media, missing local paths, remote URLs)."""
+    weights = {}
+    missing = []
+    remote = []
+    for path in sorted(set(media_paths)):
+        if '://' in path:
+            remote.append(path)
+            continue
+        try:
+            weights[path] = os.path.getsize(os.path.join(site_dir, path))
+        except OSError:
+            missing.append(path)
+    return weights, missing, remote
+
+
+def print_report(pages, cards, media, missing, remote, top=10):
+    """Print page sizes, the largest cards and the weight of referenced media."""
+    print('  Pages:')
+    for name, size in pages.items():
+        print(f'    {name:<24} {_kb(size):>12}')
+
+    if cards:
+        total = sum(cards.values())
+        print(f'  Cards: {len(cards)} cards, {_kb(total)} total, {_kb(total / len(cards))} average')
+        for paper_id, size in sorted(cards.items(), key=lambda item: item[1], reverse=True)[:top]:
+            print(f'    {paper_id:<24} {_kb(size):>12}')
+
+    notes = []
+    if missing:
+        notes.append(f'{len(missing)} missing')
+    if remote:
+        notes.append(f'{len(remote)} remote, not measured')
+    print(f'  Media: {len(media)} local files, {_kb(sum(media.values()))} total'
+          + (f' ({"; ".join(notes)})' if notes else ''))
+    for path, size in sorted(media.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f'    {path:<40} {_kb(size):>12}')
+    for path in missing:
+        print(f'    {path:<40} {"missing":>12}')
+
+
+def load_budgets(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def check_budgets(budgets, pages, cards, media, missing):
+    """Return a list of human-readable budget violations (empty if all are met)."""
+    violations = []
+    page_budgets = budgets.get('page_bytes', {})
+    for name, size in pages.items():
+        limit = page_budgets.get(name, page_budgets.get('default'))
+        if limit is not None and size > limit:
+            violations.append(f'page {name} is {_kb(size)} (budget {_kb(limit)})')
+
+    limit = budgets.get('card_bytes')
+    if limit is not None:
+        for paper_id, size in cards.items():
+            if size > limit:
+                violations.append(f'card {paper_id} is {_kb(size)} (budget {_kb(limit)})')
+
+    limit = budgets.get('media_bytes')
+    if limit is not None:
+        for path, size in sorted(media.items()):
+            if size > limit:
+                violations.append(f'media {path} is {_kb(size)} (budget {_kb(limit)})')
+    for path in missing:
+        violations.append(f'media {path} is referenced but missing')
+    return violations
@@ -1,22 +1,47 @@
 #!/usr/bin/env python3
-"""One-time script to download member photos from their personal websites.
+"""Download member photos from their personal websites.
 
-Usage: python build/scrape_photos.py  (from the ppl/ directory)
+Usage: python build/scrape_photos.py [--workers N] [--skip-existing]  (from the ppl/ directory)
 
 This script attempts to find and download profile photos from each member's
 personal website. Photos are saved to assets/people/.
+
+Members are processed concurrently by a bounded pool of worker threads.
+Each thread keeps one HTTP connection open per host. The http_proxy,
+https_proxy and no_proxy environment variables are honoured as urllib does:
+HTTPS goes through a CONNECT tunnel, and plain HTTP is sent to the proxy
+with absolute URLs. For every photo it
+downloads, the source URL and its ETag/Last-Modified headers are recorded
+in assets/people/.photo_meta.json. Later runs re-request those photos
+conditionally and only rewrite the ones that changed. Photos without
+metadata (e.g. added by hand) are never overwritten.
 """
 
-import json
 import os
 import re
+import json
+import time
+import base64
+import argparse
+import threading
+import http.client
+import urllib.parse
 import urllib.request
-import urllib.error
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from html.parser import HTMLParser
 
 ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 PEOPLE_JSON = os.path.join(ROOT, 'data', 'people.json')
 PHOTO_DIR = os.path.join(ROOT, 'assets', 'people')
+META_FILENAME = '.photo_meta.json'
+
+USER_AGENT = 'Mozilla/5.0'
+TIMEOUT = 10
+MAX_REDIRECTS = 5
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+
+Response = namedtuple('Response', ['status', 'headers', 'body', 'url'])
 
 
 class OGImageParser(HTMLParser):
@@ -46,103 +71,324 @@ class OGImageParser(HTMLParser):
                 self.profile_images.append(src)
 
 
-def download_image(url, save_path):
-    """Download an image from url to save_path."""
-    try:
-        req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            data = resp.read()
-            with open(save_path, 'wb') as f:
-                f.write(data)
-            print(f'  Downloaded: {url} -> {save_path}')
-            return True
-    except Exception as e:
-        print(f'  Failed to download {url}: {e}')
-        return False
+class Fetcher:
+    """HTTP GET client that reuses one connection per host in each thread."""
 
+    def __init__(self, timeout=TIMEOUT):
+        self.timeout = timeout
+        self.proxies = urllib.request.getproxies()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
 
-def find_and_download_photo(name, url, photo_filename):
-    """Try to find and download a profile photo from a personal website."""
-    save_path = os.path.join(PHOTO_DIR, photo_filename)
-    if os.path.exists(save_path):
-        print(f'  Skipping {name} - photo already exists')
-        return True
+    def _proxy(self, scheme, netloc):
+        """(proxy host:port, extra headers) for `scheme`, or None to connect directly."""
+        proxy = self.proxies.get(scheme)
+        if not proxy or urllib.request.proxy_bypass(urllib.parse.urlsplit('//' + netloc).hostname):
+            return None
+        parts = urllib.parse.urlsplit(proxy if '://' in proxy else 'http://' + proxy)
+        headers = {}
+        if parts.username:
+            credentials = f'{urllib.parse.unquote(parts.username)}:{urllib.parse.unquote(parts.password or "")}'
+            headers['Proxy-Authorization'] = 'Basic ' + base64.b64encode(credentials.encode()).decode()
+        return parts.hostname + (f':{parts.port}' if parts.port else ''), headers
+
+    def _connection(self, scheme, netloc, proxy):
+        conns = getattr(self._local, 'conns', None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get((scheme, netloc))
+        if conn is None:
+            cls = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+            if proxy is None:
+                conn = cls(netloc, timeout=self.timeout)
+            else:
+                conn = cls(proxy[0], timeout=self.timeout)
+                if scheme == 'https':
+                    conn.set_tunnel(netloc, headers=proxy[1])
+            conns[scheme, netloc] = conn
+            with self._lock:
+                self._all.append(conn)
+        return conn
+
+    def _discard(self, scheme, netloc):
+        conn = self._local.conns.pop((scheme, netloc))
+        conn.close()
+        with self._lock:
+            self._all.remove(conn)
+
+    def _request(self, url, headers):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f'unsupported URL scheme: {url}')
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        proxy = self._proxy(parts.scheme, parts.netloc)
+        if proxy is not None and parts.scheme == 'http':
+            # Plain HTTP is forwarded by the proxy itself, which needs the absolute URL
+            path = urllib.parse.urlunsplit(parts._replace(path=parts.path or '/', fragment=''))
+            headers = dict(headers, **proxy[1])
+        for attempt in (1, 2):
+            conn = self._connection(parts.scheme, parts.netloc, proxy)
+            try:
+                conn.request('GET', path, headers=headers)
+                resp = conn.getresponse()
+                body = resp.read()
+                return resp.status, {k.lower(): v for k, v in resp.getheaders()}, body
+            except Exception as e:
+                # Never reuse a connection left in an unknown state (e.g. after a timeout)
+                self._discard(parts.scheme, parts.netloc)
+                stale = isinstance(e, (http.client.RemoteDisconnected, BrokenPipeError,
+                                       ConnectionResetError))
+                # The server dropped an idle keep-alive connection; retry once on a fresh one
+                if not stale or attempt == 2:
+                    raise
+
+    def get(self, url, headers=None):
+        """GET `url`, following redirects. Returns a Response."""
+        request_headers = {'User-Agent': USER_AGENT}
+        request_headers.update(headers or {})
+        for _ in range(MAX_REDIRECTS + 1):
+            status, resp_headers, body = self._request(url, request_headers)
+            if status in REDIRECT_CODES and 'location' in resp_headers:
+                url = urllib.parse.urljoin(url, resp_headers['location'])
+                continue
+            return Response(status, resp_headers, body, url)
+        raise IOError(f'too many redirects for {url}')
+
+    def close(self):
+        with self._lock:
+            for conn in self._all:
+                conn.close()
+            self._all = []
+
+
+class PhotoMeta:
+    """Thread-safe store of source URL and cache validators for each downloaded photo."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            with open(path, 'r') as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+    def get(self, filename):
+        with self._lock:
+            return self.entries.get(filename)
+
+    def set(self, filename, entry):
+        with self._lock:
+            self.entries[filename] = entry
+
+    def save(self):
+        with self._lock:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+class MemberResult:
+    """Outcome of processing one member, with its log lines and timing."""
+
+    def __init__(self, name):
+        self.name = name
+        self.status = 'failed'
+        self.seconds = 0.0
+        self.log = []
+
+
+def write_atomic(save_path, data):
+    tmp_path = save_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, save_path)
+
+
+def validators(resp):
+    return {'etag': resp.headers.get('etag'), 'last_modified': resp.headers.get('last-modified')}
 
-    if not url or url == '#':
-        print(f'  Skipping {name} - no URL')
-        return False
 
-    print(f'Processing {name}: {url}')
+def download_image(fetcher, url, save_path, result):
+    """Download an image from url to save_path. Returns its metadata entry, or None."""
+    try:
+        resp = fetcher.get(url)
+        if resp.status != 200:
+            raise IOError(f'HTTP {resp.status}')
+        write_atomic(save_path, resp.body)
+    except Exception as e:
+        result.log.append(f'  Failed to download {url}: {e}')
+        return None
+    result.log.append(f'  Downloaded: {url} -> {save_path}')
+    return dict(validators(resp), image_url=url)
 
+
+def refresh_photo(fetcher, entry, save_path, result):
+    """Conditionally re-fetch a previously downloaded photo. Returns the updated entry."""
+    headers = {}
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
     try:
-        req = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            html = resp.read().decode('utf-8', errors='replace')
+        resp = fetcher.get(entry['image_url'], headers)
     except Exception as e:
-        print(f'  Failed to fetch {url}: {e}')
-        return False
+        result.log.append(f'  Failed to refresh {entry["image_url"]}: {e}')
+        return None
+    if resp.status == 304:
+        result.status = 'unchanged'
+        return entry
+    if resp.status != 200:
+        result.log.append(f'  Failed to refresh {entry["image_url"]}: HTTP {resp.status}')
+        return None
+    try:
+        write_atomic(save_path, resp.body)
+    except OSError as e:
+        result.log.append(f'  Failed to save {entry["image_url"]} to {save_path}: {e}')
+        return None
+    result.status = 'updated'
+    result.log.append(f'  Updated: {entry["image_url"]} -> {save_path}')
+    return dict(entry, **validators(resp))
 
+
+def find_photo_candidates(url, html):
+    """Candidate image URLs on a personal page, most likely first."""
     parser = OGImageParser()
     try:
         parser.feed(html)
     except Exception:
         pass
 
+    candidates = []
     # Try og:image first
     if parser.og_image:
-        img_url = parser.og_image
-        if not img_url.startswith('http'):
-            img_url = urllib.request.urljoin(url, img_url)
-        if download_image(img_url, save_path):
-            return True
-
-    # Try profile-like images
-    for src in parser.profile_images:
-        if not src.startswith('http'):
-            src = urllib.request.urljoin(url, src)
-        if download_image(src, save_path):
-            return True
-
+        candidates.append(parser.og_image)
+    # Then profile-like images
+    candidates.extend(parser.profile_images)
     # Fallback: look for common image patterns in the HTML
     img_patterns = re.findall(r'(?:src|href)=["\']([^"\']*?(?:profile|avatar|photo|headshot|portrait|pic)[^"\']*?\.(?:jpg|jpeg|png|webp))["\']', html, re.IGNORECASE)
-    for src in img_patterns[:3]:
-        if not src.startswith('http'):
-            src = urllib.request.urljoin(url, src)
-        if download_image(src, save_path):
-            return True
+    candidates.extend(img_patterns[:3])
+    urls = [src if src.startswith('http') else urllib.parse.urljoin(url, src) for src in candidates]
+    return list(dict.fromkeys(urls))
+
+
+def find_and_download_photo(fetcher, meta, photo_dir, name, url, photo_filename, skip_existing=False):
+    """Try to find and download (or refresh) a member's profile photo. Returns a MemberResult."""
+    result = MemberResult(name)
+    start = time.perf_counter()
+    try:
+        _process_member(fetcher, meta, photo_dir, result, url, photo_filename, skip_existing)
+    finally:
+        result.seconds = time.perf_counter() - start
+    return result
 
-    print(f'  Could not find photo for {name}')
-    return False
 
+def _process_member(fetcher, meta, photo_dir, result, url, photo_filename, skip_existing):
+    save_path = os.path.join(photo_dir, photo_filename)
+    entry = meta.get(photo_filename)
+    if os.path.exists(save_path):
+        if skip_existing or entry is None:
+            result.status = 'skipped'
+            result.log.append(f'  Skipping {result.name} - photo already exists')
+            return
+        entry = refresh_photo(fetcher, entry, save_path, result)
+        if entry is not None:
+            meta.set(photo_filename, entry)
+        return
 
-def main():
-    os.makedirs(PHOTO_DIR, exist_ok=True)
+    if not url or url == '#':
+        result.status = 'no-url'
+        result.log.append(f'  Skipping {result.name} - no URL')
+        return
+
+    result.log.append(f'Processing {result.name}: {url}')
+    try:
+        resp = fetcher.get(url)
+        if resp.status != 200:
+            raise IOError(f'HTTP {resp.status}')
+        html = resp.body.decode('utf-8', errors='replace')
+    except Exception as e:
+        result.log.append(f'  Failed to fetch {url}: {e}')
+        return
 
-    with open(PEOPLE_JSON) as f:
+    for img_url in find_photo_candidates(resp.url, html):
+        entry = download_image(fetcher, img_url, save_path, result)
+        if entry is not None:
+            entry['page_url'] = url
+            meta.set(photo_filename, entry)
+            result.status = 'downloaded'
+            return
+
+    result.log.append(f'  Could not find photo for {result.name}')
+
+
+def load_members(people_json):
+    with open(people_json) as f:
         people = json.load(f)
 
     members = []
-    for p in people.get('phd_students', []):
-        filename = os.path.basename(p.get('photo', ''))
-        if filename:
-            members.append((p['name'], p.get('url', ''), filename))
-    for p in people.get('ms_students', []):
+    for p in people.get('phd_students', []) + people.get('ms_students', []):
         filename = os.path.basename(p.get('photo', ''))
         if filename:
             members.append((p['name'], p.get('url', ''), filename))
+    return members
+
+
+def print_summary(results, wall):
+    print('\nSummary:')
+    for r in sorted(results, key=lambda r: r.seconds, reverse=True):
+        print(f'  {r.seconds:6.2f}s  {r.status:<10}  {r.name}')
+    counts = {}
+    for r in results:
+        counts[r.status] = counts.get(r.status, 0) + 1
+    totals = ', '.join(f'{n} {status}' for status, n in sorted(counts.items()))
+    print(f'\nDone in {wall:.2f}s: {totals}.')
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(description='Download member photos from their personal websites.')
+    arg_parser.add_argument('--workers', type=int, default=8,
+                            help='number of members processed concurrently')
+    arg_parser.add_argument('--skip-existing', action='store_true',
+                            help='do not re-check photos that already exist')
+    arg_parser.add_argument('--people', default=PEOPLE_JSON, help='path to people.json')
+    arg_parser.add_argument('--photo-dir', default=PHOTO_DIR, help='directory photos are saved to')
+    arg_parser.add_argument('--timeout', type=float, default=TIMEOUT, help='per-request timeout in seconds')
+    args = arg_parser.parse_args(argv)
+
+    os.makedirs(args.photo_dir, exist_ok=True)
+    members = load_members(args.people)
+    meta = PhotoMeta(os.path.join(args.photo_dir, META_FILENAME))
+    fetcher = Fetcher(timeout=args.timeout)
 
     print(f'Attempting to download photos for {len(members)} members...\n')
-    success = 0
-    for name, url, filename in members:
-        if find_and_download_photo(name, url, filename):
-            success += 1
-        print()
-
-    print(f'\nDone: {success}/{len(members)} photos downloaded.')
-    missing = [m[0] for m in members if not os.path.exists(os.path.join(PHOTO_DIR, m[2]))]
+    start = time.perf_counter()
+    results = []
+    try:
+        with ThreadPoolExecutor(max(1, args.workers)) as pool:
+            futures = [pool.submit(find_and_download_photo, fetcher, meta, args.photo_dir,
+                                   name, url, filename, args.skip_existing)
+                       for name, url, filename in members]
+            # Print each member's log as a block, in people.json order
+            for future in futures:
+                result = future.result()
+                results.append(result)
+                if result.log:
+                    print('\n'.join(result.log))
+    finally:
+        fetcher.close()
+        meta.save()
+
+    print_summary(results, time.perf_counter() - start)
+    missing = [m[0] for m in members if not os.path.exists(os.path.join(args.photo_dir, m[2]))]
     if missing:
         print(f'Missing photos for: {", ".join(missing)}')
         print('You may need to manually download these photos.')
+    return results
 
 
 if __name__ == '__main__':
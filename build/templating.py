@@ -0,0 +1,91 @@
+"""Minimal compiled templates for the site build.
+
+A template is HTML with `{{NAME}}` placeholders. It is compiled once into an
+alternating list of literal text and slot names. render() then fills every
+slot in a single pass, yielding fragments instead of building the page
+through chained str.replace calls.
+
+Compiled templates loaded from disk are cached in-process and recompiled
+only when the file's mtime or size changes.
+"""
+
+import os
+import re
+
+PLACEHOLDER_RE = re.compile(r'\{\{(.*?)\}\}')
+NAME_RE = re.compile(r'[A-Z][A-Z0-9_]*$')
+
+# path -> ((mtime_ns, size), Template)
+_cache = {}
+
+
+class TemplateError(Exception):
+    """Raised for malformed templates and unknown or unfilled placeholders."""
+
+
+class Template:
+    """A template compiled into literals and slot names.
+
+    `literals` always has one more entry than `slots`; the rendered output is
+    literals[0] + value(slots[0]) + literals[1] + ... + literals[-1].
+    """
+
+    def __init__(self, text, name='<string>'):
+        self.name = name
+        self.literals = []
+        self.slots = []
+        pos = 0
+        for m in PLACEHOLDER_RE.finditer(text):
+            slot = m.group(1)
+            if not NAME_RE.match(slot):
+                raise TemplateError(f'{name}: invalid placeholder {m.group(0)!r}')
+            self.literals.append(text[pos:m.start()])
+            self.slots.append(slot)
+            pos = m.end()
+        self.literals.append(text[pos:])
+        self.names = frozenset(self.slots)
+        self._repeated = {slot for slot in self.names if self.slots.count(slot) > 1}
+
+    def render(self, values):
+        """Yield the output fragments with every placeholder filled from `values`.
+
+        A value is either a string or an iterable of string fragments, which
+        is streamed through without being joined. Raises TemplateError before
+        producing any output if a placeholder has no value or a value has no
+        placeholder.
+        """
+        missing = self.names - values.keys()
+        if missing:
+            raise TemplateError(f'{self.name}: unfilled placeholder(s) {", ".join(sorted(missing))}')
+        unknown = values.keys() - self.names
+        if unknown:
+            raise TemplateError(f'{self.name}: unknown placeholder(s) {", ".join(sorted(unknown))}')
+        values = dict(values)
+        for slot in self._repeated:
+            if not isinstance(values[slot], str):
+                values[slot] = ''.join(values[slot])
+        return self._render(values)
+
+    def _render(self, values):
+        literals = self.literals
+        for i, slot in enumerate(self.slots):
+            yield literals[i]
+            value = values[slot]
+            if isinstance(value, str):
+                yield value
+            else:
+                yield from value
+        yield literals[-1]
+
+
+def load_template(path):
+    """Return the compiled template at `path`, recompiling only if the file changed."""
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    cached = _cache.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with open(path, 'r') as f:
+        template = Template(f.read(), name=os.path.basename(path))
+    _cache[path] = (stamp, template)
+    return template
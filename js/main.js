@@ -15,11 +15,30 @@ document.addEventListener('DOMContentLoaded', function() {
   }
 });
 
-// Toggle bibtex blocks
+// Fetch the contents of a lazily built block (data-src) once, on first open
+function loadblock(block) {
+  var src = block.getAttribute('data-src');
+  if (!src || block.getAttribute('data-loaded')) return;
+  block.setAttribute('data-loaded', 'loading');
+  block.textContent = 'Loading...';
+  fetch(src).then(function(resp) {
+    if (!resp.ok) throw new Error(resp.status);
+    return resp.text();
+  }).then(function(text) {
+    block.textContent = text.trim();
+    block.setAttribute('data-loaded', 'done');
+  }).catch(function() {
+    block.textContent = '(could not load ' + src + ')';
+    block.removeAttribute('data-loaded');
+  });
+}
+
+// Toggle bibtex and abstract blocks
 function toggleblock(blockId) {
   var block = document.getElementById(blockId);
   if (!block) return;
   if (block.style.display === 'none' || block.style.display === '') {
+    loadblock(block);
     block.style.display = 'block';
   } else {
     block.style.display = 'none';
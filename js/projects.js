@@ -1,44 +1,53 @@
 // Topic filtering on the projects page
 document.addEventListener('DOMContentLoaded', function() {
   var filterBar = document.getElementById('filter-bar');
-  if (filterBar) {
+  var indexEl = document.getElementById('projects-index');
+  if (filterBar && indexEl) {
+    // Precomputed by build.py: card and year-divider ordinals per topic
+    var index = JSON.parse(indexEl.textContent);
     var buttons = filterBar.querySelectorAll('.filter__btn');
     var cards = document.querySelectorAll('.card--project');
     var yearDividers = document.querySelectorAll('.year-divider');
+    var visible = [];
+    for (var i = 0; i < cards.length; i++) visible.push(true);
+
+    var applyFilter = function(topic) {
+      var show = [];
+      var all = topic === 'all';
+      var ordinals = index.topics[topic] || [];
+      for (var i = 0; i < cards.length; i++) show.push(all);
+      for (var j = 0; j < ordinals.length; j++) show[ordinals[j]] = true;
+
+      // Only touch cards whose visibility changes
+      for (var k = 0; k < cards.length; k++) {
+        if (show[k] !== visible[k]) {
+          cards[k].style.display = show[k] ? '' : 'none';
+          visible[k] = show[k];
+        }
+      }
+
+      // A year divider is shown if any card under it matches the topic
+      var counts = index.counts[topic] || [];
+      for (var y = 0; y < yearDividers.length; y++) {
+        yearDividers[y].style.display = counts[y] ? '' : 'none';
+      }
+    };
 
     buttons.forEach(function(btn) {
+      var topic = btn.getAttribute('data-topic');
+      var counts = index.counts[topic] || [];
+      var total = 0;
+      for (var y = 0; y < counts.length; y++) total += counts[y];
+      var countEl = document.createElement('span');
+      countEl.className = 'filter__count';
+      countEl.textContent = total;
+      btn.appendChild(countEl);
+
       btn.addEventListener('click', function() {
         // Update active button
         buttons.forEach(function(b) { b.classList.remove('filter__btn--active'); });
         btn.classList.add('filter__btn--active');
-
-        var topic = btn.getAttribute('data-topic');
-
-        // Show/hide cards
-        cards.forEach(function(card) {
-          if (topic === 'all') {
-            card.style.display = '';
-          } else {
-            var topics = card.getAttribute('data-topics') || '';
-            if (topics.split(',').indexOf(topic) !== -1) {
-              card.style.display = '';
-            } else {
-              card.style.display = 'none';
-            }
-          }
-        });
-
-        // Show/hide year dividers based on whether any cards in that year are visible
-        yearDividers.forEach(function(divider) {
-          var year = divider.getAttribute('data-year');
-          var hasVisible = false;
-          cards.forEach(function(card) {
-            if (card.getAttribute('data-year') === year && card.style.display !== 'none') {
-              hasVisible = true;
-            }
-          });
-          divider.style.display = hasVisible ? '' : 'none';
-        });
+        applyFilter(topic);
       });
     });
   }